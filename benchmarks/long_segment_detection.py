@@ -0,0 +1,53 @@
+"""Compares full-text language detection of long segments
+with detection from a length-capped sample of their text.
+
+Usage, from the repository root:
+    python -m benchmarks.long_segment_detection segments.txt ENGLISH GERMAN [...]
+
+segments.txt should contain one segment per line, only segments longer than
+MAX_SEGMENT_LENGTH characters are used, as shorter ones are never sampled.
+
+No reference results have been recorded yet, which is why the "Sample long segments" option
+is opt-in. Run this on representative documents before relying on the speed-up."""
+
+from sys import argv
+from time import perf_counter
+from lingua import Language, LanguageDetectorBuilder
+from language_detect import MAX_SEGMENT_LENGTH, predict_language, predict_language_sampled
+
+
+def benchmark_long_segment_detection(segments_file: str, languages: list[Language]) -> None:
+    """Detects the language of long segments with and without sampling
+    and prints the throughput of both, along with their agreement.
+
+    Args:
+        - segments_file (str): File containing one segment per line.
+        - languages (list[Language]): Languages to detect between."""
+
+    with open(segments_file, "r", encoding="utf-8") as file:
+        segments = [line.strip() for line in file if len(line.strip()) > MAX_SEGMENT_LENGTH]
+
+    if not segments:
+        print(f"No segments longer than {MAX_SEGMENT_LENGTH} characters found.")
+        return
+
+    detector = (LanguageDetectorBuilder.from_languages(*languages)
+                .with_preloaded_language_models()
+                .build())
+    results = {}
+
+    for label, predict in (("full text", predict_language), ("sampled", predict_language_sampled)):
+        start = perf_counter()
+        results[label] = [predict(detector, segment) for segment in segments]
+        elapsed = perf_counter() - start
+
+        print(f"{label:>9}: {len(segments)} segments in {elapsed:8.2f}s "
+              f"({len(segments) / elapsed:,.1f} segments/s)")
+
+    agreement = sum(full == sampled for full, sampled
+                    in zip(results["full text"], results["sampled"])) / len(segments)
+    print(f"Agreement with full-text detection: {agreement:.2%}")
+
+
+if __name__ == "__main__":
+    benchmark_long_segment_detection(argv[1], [Language[name.upper()] for name in argv[2:]])
@@ -0,0 +1,29 @@
+"""Compares the default PDF extraction (layout sorting + Punkt tokenization)
+with the fast block-level extraction mode.
+
+Usage, from the repository root:
+    python -m benchmarks.pdf_extraction file1.pdf [file2.pdf ...]"""
+
+from sys import argv
+from time import perf_counter
+from file_utils.pdf_file_processing import process_pdf_files
+
+
+def benchmark_pdf_extraction(files: list[str]) -> None:
+    """Extracts text from the given PDF files using both extraction modes
+    and prints the number of segments and the time each mode took.
+
+    Args:
+        - files (list[str]): File paths of the PDF files to benchmark on."""
+
+    for label, fast_mode in (("sort + Punkt", False), ("fast blocks", True)):
+        start = perf_counter()
+        segments = process_pdf_files(files, fast_mode=fast_mode)
+        elapsed = perf_counter() - start
+
+        print(f"{label:>12}: {len(segments):>9} segments in {elapsed:8.2f}s "
+              f"({len(segments) / elapsed:,.0f} segments/s)")
+
+
+if __name__ == "__main__":
+    benchmark_pdf_extraction(argv[1:])
@@ -0,0 +1,194 @@
+"""This module provides functions for running jobs with checkpointing,
+so that long-running jobs can be resumed after a crash or an interruption.
+
+A job's settings are stored in its checkpoint directory when it is created.
+While the job runs, the text extracted from each file, and the predictions for each batch
+of segments detected one by one, are written to the checkpoint directory as soon as they are done.
+Passes that look across segments, such as the per-file language prior, context windows,
+and near-duplicate collapsing, are not checkpointed, they always run over all of the text,
+and leave the same segments to the batches.
+A resumed job loads all completed work and continues with the unfinished files and batches.
+Since batches are the same regardless of interruptions, and the report's creation time
+is taken from the job, the final report matches that of an uninterrupted run byte for byte."""
+
+import json
+import pickle
+from datetime import datetime
+from os import makedirs, replace
+from os.path import exists, join
+from typing import Any, Callable, Optional
+from lingua import Language
+from pandas import Series
+from file_utils.file_processing import flatten_by_source, order_files, process_files_by_source
+from text_processing import process_text
+from language_detect import detect_language
+
+
+# Number of segments detected one by one whose predictions are checkpointed together.
+CHECKPOINT_BATCH_SIZE = 50_000
+
+_JOB_FILE = "job.json"
+
+
+def has_job(checkpoint_dir: str) -> bool:
+    """Checks whether the checkpoint directory contains a job that can be resumed.
+
+    Args:
+        - checkpoint_dir (str): Checkpoint directory of the job.
+
+    Returns:
+        - bool: True if a job exists, False if not."""
+
+    return exists(join(checkpoint_dir, _JOB_FILE))
+
+
+def create_job(checkpoint_dir: str, files: list[str], options: dict[str, bool],
+               languages: Optional[list[Language]] = None,
+               pdf_page_range: Optional[tuple[int, int]] = None) -> None:
+    """Creates a new checkpointed job by storing its settings.
+
+    Args:
+        - checkpoint_dir (str): Checkpoint directory of the job, created if it does not exist.
+        - files (list[str]): File paths to process.
+        - options (dict[str, bool]): Advanced options selected by the user.
+        - languages (list[Language]): Languages to detect between,
+        no language detection is performed if not given.
+        - pdf_page_range (tuple[int, int]): Zero-based start and end-exclusive stop
+        of the pages to extract from each PDF file, all pages are extracted by default."""
+
+    makedirs(join(checkpoint_dir, "extracted"), exist_ok=True)
+    makedirs(join(checkpoint_dir, "predictions"), exist_ok=True)
+
+    job = {
+        "files": order_files(files),
+        "options": options,
+        "languages": [language.name for language in languages] if languages else None,
+        "pdf_page_range": list(pdf_page_range) if pdf_page_range else None,
+        "created": datetime.now().replace(microsecond=0).isoformat(),
+    }
+
+    with open(join(checkpoint_dir, f"{_JOB_FILE}.tmp"), "w", encoding="utf-8") as file:
+        json.dump(job, file, ensure_ascii=False)
+
+    replace(join(checkpoint_dir, f"{_JOB_FILE}.tmp"), join(checkpoint_dir, _JOB_FILE))
+
+
+def get_job_options(checkpoint_dir: str) -> dict[str, bool]:
+    """Returns the advanced options the job was created with.
+
+    Args:
+        - checkpoint_dir (str): Checkpoint directory of the job.
+
+    Returns:
+        - dict[str, bool]: Advanced options selected by the user."""
+
+    return _load_job(checkpoint_dir)["options"]
+
+
+def run_job(checkpoint_dir: str) -> tuple[Series, Optional[Series], datetime]:
+    """Runs a checkpointed job, skipping any work completed by previous runs.
+
+    Args:
+        - checkpoint_dir (str): Checkpoint directory of the job.
+
+    Returns:
+        - Series: Processed text of all files.
+        - Series: Language predictions, None if no language detection is performed.
+        - datetime: Creation time of the job, to be used as the report's creation time."""
+
+    job = _load_job(checkpoint_dir)
+    options: dict[str, bool] = job["options"]
+    pdf_page_range = job.get("pdf_page_range")
+    extracted_text, sources = _extract_text(checkpoint_dir, job["files"], options,
+                                            tuple(pdf_page_range) if pdf_page_range else None)
+    processed_text = process_text(extracted_text, options, sources)
+
+    predictions = None
+    if job["languages"]:
+        languages = [Language[name] for name in job["languages"]]
+        predictions = _detect_language(checkpoint_dir, processed_text, languages, options)
+
+    return processed_text, predictions, datetime.fromisoformat(job["created"])
+
+
+def _load_job(checkpoint_dir: str) -> dict[str, Any]:
+    with open(join(checkpoint_dir, _JOB_FILE), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _extract_text(checkpoint_dir: str, files: list[str], options: dict[str, bool],
+                  pdf_page_range: Optional[tuple[int, int]] = None
+                  ) -> tuple[list[str], list[str]]:
+    """Extracts text from all files that have not been extracted yet,
+    checkpointing each file as soon as it is done.
+
+    Args:
+        - checkpoint_dir (str): Checkpoint directory of the job.
+        - files (list[str]): File paths to process, in processing order.
+        - options (dict[str, bool]): Advanced options selected by the user.
+        - pdf_page_range (tuple[int, int]): Pages to extract from each PDF file, all by default.
+
+    Returns:
+        - list[str]: Extracted text from all files, in processing order.
+        - list[str]: Source file path of each extracted text entry."""
+
+    paths = {file: join(checkpoint_dir, "extracted", f"{i}.pickle")
+             for i, file in enumerate(files)}
+    remaining_files = [file for file in files if not exists(paths[file])]
+
+    if len(remaining_files) < len(files):
+        print(f"Resuming extraction, {len(files) - len(remaining_files)} "
+              f"of {len(files)} files already extracted.")
+
+    for file, file_text in process_files_by_source(remaining_files, options, pdf_page_range):
+        _dump(paths[file], file_text)
+
+    return flatten_by_source((file, _load(paths[file])) for file in files)
+
+
+def _detect_language(checkpoint_dir: str, processed_text: Series,
+                     languages: list[Language], options: dict[str, bool]) -> Series:
+    """Performs the language detection, detecting the segments left by the passes
+    that look across segments in batches that have not been completed yet,
+    and checkpointing each batch as soon as it is done.
+
+    Args:
+        - checkpoint_dir (str): Checkpoint directory of the job.
+        - processed_text (Series): Strings to perform the check on.
+        - languages (list[Language]): Languages to detect between.
+        - options (dict[str, bool]): Advanced options selected by the user.
+
+    Returns:
+        - Series: Containing all language predictions."""
+
+    def detect_in_batches(detect: Callable[[list[str]], list[str]],
+                          texts: list[str]) -> list[str]:
+        predictions: list[str] = []
+
+        for batch, start in enumerate(range(0, len(texts), CHECKPOINT_BATCH_SIZE)):
+            path = join(checkpoint_dir, "predictions", f"{batch}.pickle")
+
+            if not exists(path):
+                _dump(path, detect(texts[start:start + CHECKPOINT_BATCH_SIZE]))
+
+            predictions.extend(_load(path))
+
+        return predictions
+
+    return detect_language(processed_text, languages, options, processed_text.index,
+                           detect_in_batches)
+
+
+def _dump(path: str, data: Any) -> None:
+    """Writes the data to a temporary file first, so that an interruption
+    never leaves an incomplete checkpoint behind."""
+
+    with open(f"{path}.tmp", "wb") as file:
+        pickle.dump(data, file)
+
+    replace(f"{path}.tmp", path)
+
+
+def _load(path: str) -> Any:
+    with open(path, "rb") as file:
+        return pickle.load(file)
@@ -0,0 +1,168 @@
+"""This module provides a long-lived local language detection server.
+
+The server keeps detectors for recently used language sets loaded in memory,
+so that separate runs and jobs on the same machine do not have to build them from scratch.
+Requests from concurrent clients are split into batches and spread across all cores.
+
+Start it with `python detection_server.py`, and enable the "Use detection server" option.
+If it is started on another host or port, set the LINGUASORT_DETECTION_SERVER environment variable
+of the clients to its address, e.g. "127.0.0.1:9000".
+
+Endpoints:
+- GET /health: Responds with {"status": "ok"} while the server is running.
+- POST /detect: Accepts {"languages": ["ENGLISH", ...], "texts": [...]}
+and responds with {"predictions": [...]}, one prediction per text.
+If the request also contains "confidence": true, each prediction is
+a [language, confidence] pair of the most likely language instead.
+If it contains "sample_long": true, long texts are detected from a sample of their text.
+Invalid requests are answered with status 400, and failed detections with status 500,
+both with an {"error": "..."} body."""
+
+import json
+from argparse import ArgumentParser
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from lingua import Language, LanguageDetector, LanguageDetectorBuilder
+from language_detect import (DETECTION_SERVER_HOST, DETECTION_SERVER_PORT,
+                             predict_language, predict_language_sampled,
+                             predict_language_with_confidence)
+
+
+# Number of detectors, i.e. language sets, each worker keeps loaded.
+MAX_CACHED_DETECTORS = 8
+# Number of texts handled by a single worker task.
+BATCH_SIZE = 500
+
+
+def serve(host: str = DETECTION_SERVER_HOST, port: int = DETECTION_SERVER_PORT,
+          workers: Optional[int] = None) -> None:
+    """Runs the detection server until it is interrupted.
+
+    Args:
+        - host (str): Address to listen on, localhost by default.
+        - port (int): Port to listen on.
+        - workers (int): Number of worker processes, one per core by default."""
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        with _DetectionServer((host, port), pool) as server:
+            print(f"Detection server listening on http://{host}:{port}")
+
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+
+class _DetectionServer(ThreadingHTTPServer):
+    """HTTP server handling each client in its own thread,
+    while the detection itself is performed by a shared pool of worker processes."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], pool: Executor) -> None:
+        super().__init__(address, _DetectionRequestHandler)
+        self.pool = pool
+
+    def detect(self, languages: tuple[str, ...], texts: list[str],
+               confidence: bool = False, sample_long: bool = False) -> list:
+        """Splits the texts into batches and detects them on the worker pool.
+
+        Args:
+            - languages (tuple[str, ...]): Sorted names of the languages to detect between.
+            - texts (list[str]): Texts to perform the check on.
+            - confidence (bool): Whether to include the confidence of each prediction.
+            - sample_long (bool): Whether to detect long texts from a sample of their text.
+
+        Returns:
+            - list: Formatted language predictions, one per text."""
+
+        batches = [texts[start:start + BATCH_SIZE]
+                   for start in range(0, len(texts), BATCH_SIZE)]
+        results = self.pool.map(_detect_batch, [languages] * len(batches), batches,
+                                [confidence] * len(batches), [sample_long] * len(batches))
+
+        return [prediction for result in results for prediction in result]
+
+
+class _DetectionRequestHandler(BaseHTTPRequestHandler):
+    """Handles health checks and detection requests."""
+
+    server: _DetectionServer
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        if self.path != "/detect":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            languages = tuple(sorted(Language[name].name for name in request["languages"]))
+            texts = [str(text) for text in request["texts"]]
+            confidence = bool(request.get("confidence", False))
+            sample_long = bool(request.get("sample_long", False))
+
+        except (ValueError, KeyError, TypeError) as error:
+            self._send_json(400, {"error": f"Invalid request: {error!r}"})
+            return
+
+        try:
+            predictions = self.server.detect(languages, texts, confidence, sample_long)
+
+        except Exception as error:  # pylint: disable=broad-except
+            self._send_json(500, {"error": f"Detection failed: {error!r}"})
+            return
+
+        self._send_json(200, {"predictions": predictions})
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        """Silences logging of every single request."""
+
+
+@lru_cache(maxsize=MAX_CACHED_DETECTORS)
+def _get_detector(languages: tuple[str, ...]) -> LanguageDetector:
+    """Builds a detector for the given languages, with their models preloaded,
+    or returns an already built one if the language set was used recently."""
+
+    return (LanguageDetectorBuilder
+            .from_languages(*(Language[name] for name in languages))
+            .with_preloaded_language_models()
+            .build())
+
+
+def _detect_batch(languages: tuple[str, ...], texts: list[str],
+                  confidence: bool, sample_long: bool) -> list:
+    detector = _get_detector(languages)
+
+    if confidence:
+        return [predict_language_with_confidence(detector, text) for text in texts]
+
+    predict = predict_language_sampled if sample_long else predict_language
+
+    return [predict(detector, text) for text in texts]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Local LinguaSort language detection server.")
+    parser.add_argument("--host", default=DETECTION_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=DETECTION_SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    arguments = parser.parse_args()
+
+    serve(arguments.host, arguments.port, arguments.workers)
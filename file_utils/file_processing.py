@@ -13,6 +13,9 @@ as they are significantly slower to process than .docx files.
 Thus, it is recommended to convert them to .docx before processing."""
 
 from dataclasses import dataclass
+from functools import partial
+from os.path import splitext
+from typing import Callable, Generator, Iterable, Optional
 from tkinter.filedialog import askopenfilenames
 from alive_progress import alive_bar
 from file_utils.word_file_processing import process_docx_files, process_doc_files
@@ -53,45 +56,110 @@ def browse_files() -> list[str]:
     return [file.lower() for file in files]
 
 
-def process_files(files: list[str]) -> list[str]:
+def process_files(files: list[str], options: Optional[dict[str, bool]] = None,
+                  pdf_page_range: Optional[tuple[int, int]] = None,
+                  csv_columns: Optional[list[int]] = None) -> list[str]:
     """Processes a list of files and extracts text from supported file types.
 
     Args:
         - files (list[str]): File paths to process.
+        - options (dict[str, bool]): Advanced options selected by the user.
+        - pdf_page_range (tuple[int, int]): Zero-based start and end-exclusive stop
+        of the pages to extract from each PDF file, all pages are extracted by default.
+        - csv_columns (list[int]): Zero-based indexes of the columns to extract
+        from each .csv and .tsv file, all columns are extracted by default.
 
     Returns:
         - list[str]: Extracted text from the processed files."""
 
-    sorted_files = _FileSorter(files)
-
     text = []
+    for _, file_text in process_files_by_source(files, options, pdf_page_range, csv_columns):
+        text.extend(file_text)
+
+    return text
+
+
+def process_files_by_source(files: list[str], options: Optional[dict[str, bool]] = None,
+                            pdf_page_range: Optional[tuple[int, int]] = None,
+                            csv_columns: Optional[list[int]] = None
+                            ) -> Generator[tuple[str, list[str]], None, None]:
+    """Processes a list of files one by one and extracts text from supported file types,
+    keeping the text of each file separate.
+    Files are processed in the order given by `order_files`,
+    and each file's text is yielded as soon as it is extracted.
 
-    with alive_bar(spinner="classic",
+    Args:
+        - files (list[str]): File paths to process.
+        - options (dict[str, bool]): Advanced options selected by the user.
+        - pdf_page_range (tuple[int, int]): Zero-based start and end-exclusive stop
+        of the pages to extract from each PDF file, all pages are extracted by default.
+        - csv_columns (list[int]): Zero-based indexes of the columns to extract
+        from each .csv and .tsv file, all columns are extracted by default.
+
+    Returns:
+        - tuple[str, list[str]]: File path, along with the text extracted from it."""
+
+    options = options or {}
+    sorted_files = _FileSorter(files)
+    process_pdf = partial(process_pdf_files,
+                          remove_boilerplate=options.get("Remove PDF boilerplate", False),
+                          fast_mode=options.get("Fast PDF extraction", False),
+                          page_range=pdf_page_range)
+
+    processors: list[tuple[list[str], Callable[[list[str]], list[str]]]] = [
+        (sorted_files.docx_files, process_docx_files),
+        (sorted_files.doc_files, process_doc_files),
+        (sorted_files.spreadsheets, process_excel_files),
+        (sorted_files.text_files, partial(process_text_files, columns=csv_columns)),
+        (sorted_files.pdf_files, process_pdf),
+    ]
+
+    with alive_bar(total=len(sorted_files.ordered_files()),
+                   spinner="classic",
                    title="File preprocessing:") as progress_bar:
+        for group, processor in processors:
+            for file in group:
+                yield file, processor([file])
+                progress_bar()
 
-        if sorted_files.docx_files:
-            text.extend(process_docx_files(sorted_files.docx_files))
 
-        if sorted_files.doc_files:
-            text.extend(process_doc_files(sorted_files.doc_files))
+def flatten_by_source(files_text: Iterable[tuple[str, list[str]]]) -> tuple[list[str], list[str]]:
+    """Flattens the text extracted from each file, keeping track of where each entry came from.
 
-        if sorted_files.spreadsheets:
-            text.extend(process_excel_files(sorted_files.spreadsheets))
+    Args:
+        - files_text (Iterable[tuple[str, list[str]]]): File paths,
+        along with the text extracted from them.
 
-        if sorted_files.text_files:
-            text.extend(process_text_files(sorted_files.text_files))
+    Returns:
+        - list[str]: Extracted text from all files.
+        - list[str]: Source file path of each extracted text entry."""
 
-        if sorted_files.pdf_files:
-            text.extend(process_pdf_files(sorted_files.pdf_files))
+    text: list[str] = []
+    sources: list[str] = []
 
-        progress_bar()
+    for file, file_text in files_text:
+        text.extend(file_text)
+        sources.extend([file] * len(file_text))
 
-    return text
+    return text, sources
+
+
+def order_files(files: list[str]) -> list[str]:
+    """Orders the files the way they are processed, grouped by file type.
+    Unsupported files are left out.
+
+    Args:
+        - files (list[str]): File paths to order.
+
+    Returns:
+        - list[str]: File paths in processing order."""
+
+    return _FileSorter(files).ordered_files()
 
 
 @dataclass
 class _FileSorter():
-    """Sorts files based on their extensions."""
+    """Sorts files based on their extensions, regardless of their case."""
 
     def __init__(self, files: list[str]) -> None:
         self._sort_files(files)
@@ -104,7 +172,7 @@ class _FileSorter():
         self.doc_files: list[str] = []
 
         for file in files:
-            extension = "." + file.split(".")[-1]
+            extension = splitext(file)[1].lower()
 
             if extension == ".docx":
                 self.docx_files.append(file)
@@ -116,3 +184,9 @@ class _FileSorter():
                 self.text_files.append(file)
             elif extension == ".pdf":
                 self.pdf_files.append(file)
+
+    def ordered_files(self) -> list[str]:
+        """Returns all supported files in processing order."""
+
+        return (self.docx_files + self.doc_files + self.spreadsheets
+                + self.text_files + self.pdf_files)
@@ -1,53 +1,190 @@
 """This module provides functions for processing PDF files.
 Specifically, it includes a function for extracting all text from a PDF file
-and another function for tokenizing the extracted text into sentences."""
+and another function for tokenizing the extracted text into sentences.
+Optionally, repeated headers, footers, page numbers, and other boilerplate
+can be removed from the extracted text.
 
+Fast mode skips both layout sorting and sentence tokenization,
+instead every text block found by PyMuPDF becomes a segment of its own."""
+
+from collections import Counter
+from math import ceil
 from re import sub
-from typing import Generator
+from typing import Generator, Optional
 from nltk.data import load
 from nltk.tokenize.punkt import PunktSentenceTokenizer
 from fitz import Document
+from text_processing import normalize_segment
+
+
+# Share of a document's pages a text block has to repeat on to be considered boilerplate.
+BOILERPLATE_THRESHOLD = 0.5
+# Documents with fewer pages than this are never checked for boilerplate.
+MIN_BOILERPLATE_PAGES = 3
+# Number of vertical bands a page is divided into when fingerprinting block positions.
+_POSITION_BANDS = 20
 
+_Fingerprint = tuple[str, int]
 
-def process_pdf_files(files: list[str]) -> list[str]:
+
+def process_pdf_files(files: list[str], remove_boilerplate: bool = False,
+                      fast_mode: bool = False,
+                      page_range: Optional[tuple[int, int]] = None) -> list[str]:
     """Processes a list of PDF files, extracting all text and tokenizing it into sentences.
 
     Args:
         - pdf_file (str): File paths for the PDF file to be processed.
+        - remove_boilerplate (bool): Whether to remove text blocks repeated across pages,
+        such as running headers, footers, and page numbers.
+        - fast_mode (bool): Whether to use unsorted block-level extraction,
+        where each text block becomes a segment, instead of sorting and tokenization.
+        - page_range (tuple[int, int]): Zero-based start and end-exclusive stop
+        of the pages to extract from each file, all pages are extracted by default.
 
     Returns:
         - list[str]: A list of all sentences extracted from the PDF files."""
 
+    if fast_mode:
+        segments = []
+        for file in files:
+            segments.extend(_process_pdf_file_fast(file, remove_boilerplate, page_range))
+
+        return segments
+
     tokenizer = load("tokenizers/punkt/english.pickle")
 
     extracted_text = []
     for file in files:
-        extracted_text.extend(_process_pdf_file(file))
+        extracted_text.extend(_process_pdf_file(file, remove_boilerplate, page_range))
 
     sentences = tokenize_text(extracted_text, tokenizer)
 
     return sentences
 
 
-def _process_pdf_file(file: str) -> list[str]:
-    return list(_extract_text_from_pdf(file))
+def _process_pdf_file(file: str, remove_boilerplate: bool = False,
+                      page_range: Optional[tuple[int, int]] = None) -> list[str]:
+    if remove_boilerplate:
+        pages = _remove_boilerplate(file, list(_extract_blocks_from_pdf(file, True, page_range)))
+        return ["\n".join(blocks) for blocks in pages]
 
+    return list(_extract_text_from_pdf(file, page_range))
 
-def _extract_text_from_pdf(pdf_file: str) -> Generator[str, None, None]:
+
+def _process_pdf_file_fast(file: str, remove_boilerplate: bool = False,
+                           page_range: Optional[tuple[int, int]] = None) -> list[str]:
+    """Extracts text blocks from a PDF file without layout sorting or tokenization.
+    Pages without a text layer are skipped.
+
+    Args:
+        - file (str): A file path for the PDF file to be processed.
+
+    Returns:
+        - list[str]: Text blocks, with whitespace collapsed."""
+
+    pages = list(_extract_blocks_from_pdf(file, False, page_range))
+
+    if remove_boilerplate:
+        texts = _remove_boilerplate(file, pages)
+    else:
+        texts = [[text for _, text in blocks] for blocks in pages]
+
+    return [sub(r"\s+", " ", text) for blocks in texts for text in blocks]
+
+
+def _extract_text_from_pdf(pdf_file: str,
+                           page_range: Optional[tuple[int, int]] = None
+                           ) -> Generator[str, None, None]:
     """Extracts all text from a given PDF file.
 
     Args:
         - pdf_file (str): A file path for the PDF file to be processed.
+        - page_range (tuple[int, int]): Pages to extract, all pages by default.
 
     Returns:
         - list[str]: All text extracted from the PDF file."""
 
     with Document(pdf_file) as pdf:
-        for page in pdf:
+        for page in pdf.pages(*(page_range or ())):
             page_text = page.get_text(sort=True)
             yield page_text
 
 
+def _extract_blocks_from_pdf(pdf_file: str, sort: bool = True,
+                             page_range: Optional[tuple[int, int]] = None
+                             ) -> Generator[list[tuple[_Fingerprint, str]], None, None]:
+    """Extracts all text blocks from a given PDF file, page by page.
+    Each block is fingerprinted by its normalized content
+    and the vertical band of the page it starts in.
+    Pages without a text layer are skipped.
+
+    Args:
+        - pdf_file (str): A file path for the PDF file to be processed.
+        - sort (bool): Whether to sort the blocks by their position on the page.
+        - page_range (tuple[int, int]): Pages to extract, all pages by default.
+
+    Returns:
+        - list[tuple[_Fingerprint, str]]: Fingerprinted text blocks of a single page."""
+
+    with Document(pdf_file) as pdf:
+        for page in pdf.pages(*(page_range or ())):
+            height = page.rect.height or 1
+            blocks = []
+
+            for _, y0, _, _, text, _, block_type in page.get_text("blocks", sort=sort):
+                if block_type != 0 or not text.strip():
+                    continue
+
+                band = min(int(y0 / height * _POSITION_BANDS), _POSITION_BANDS - 1)
+                blocks.append(((normalize_segment(text), band), text))
+
+            if blocks:
+                yield blocks
+
+
+def _remove_boilerplate(pdf_file: str,
+                        pages: list[list[tuple[_Fingerprint, str]]]) -> list[list[str]]:
+    """Removes text blocks that repeat in the same position on a large share of pages.
+    Only the first occurrence of each such block is kept, same as with repetitions.
+
+    Args:
+        - pdf_file (str): File path of the PDF file the pages were extracted from.
+        - pages (list[list[tuple[_Fingerprint, str]]]): Fingerprinted text blocks of each page.
+
+    Returns:
+        - list[list[str]]: Text blocks of each page, with boilerplate removed."""
+
+    if len(pages) < MIN_BOILERPLATE_PAGES:
+        return [[text for _, text in blocks] for blocks in pages]
+
+    page_counts = Counter(fingerprint for blocks in pages
+                          for fingerprint in {fingerprint for fingerprint, _ in blocks})
+    limit = max(MIN_BOILERPLATE_PAGES, ceil(len(pages) * BOILERPLATE_THRESHOLD))
+    boilerplate = {fingerprint for fingerprint, count in page_counts.items() if count >= limit}
+
+    seen: set[_Fingerprint] = set()
+    removed = 0
+    kept_pages = []
+
+    for blocks in pages:
+        kept = []
+        for fingerprint, text in blocks:
+            if fingerprint in boilerplate:
+                if fingerprint in seen:
+                    removed += 1
+                    continue
+                seen.add(fingerprint)
+            kept.append(text)
+
+        kept_pages.append(kept)
+
+    if removed:
+        print(f"Removed {removed} boilerplate blocks ({len(boilerplate)} distinct) "
+              f"from {pdf_file}.")
+
+    return kept_pages
+
+
 def tokenize_text(text: list[str], tokenizer: PunktSentenceTokenizer) -> list[str]:
     """Tokenizes provided text into sentences.
     Note: currently this uses data for English language and may not work perfectly for others.
@@ -2,21 +2,33 @@
 The module currently supports files with the extensions "txt", ".csv", and ".tsv"."""
 
 from csv import reader
-from chardet import detect_all
+from os.path import splitext
+from typing import Optional
+from chardet import detect, detect_all
 from xml.etree.ElementTree import parse as parse_xml
 import pysrt
 from nltk.data import load
 from nltk.tokenize.punkt import PunktSentenceTokenizer
 from bs4 import BeautifulSoup
+from pyarrow import ArrowInvalid, ChunkedArray, DataType, Table, float64, string as arrow_string
+from pyarrow import compute as pc, csv as arrow_csv, types as arrow_types
 from file_utils.pdf_file_processing import tokenize_text
 
 
-def process_text_files(text_files: list[str]) -> list[str]:
+# Number of bytes read from the beginning of a file to detect its encoding.
+ENCODING_SAMPLE_SIZE = 64 * 1024
+_NUMERIC_PATTERN = r"^\s*(?:[-+]?(?:\d+(?:[.,]\d*)?|[.,]\d+)(?:[eE][-+]?\d+)?)?\s*$"
+
+
+def process_text_files(text_files: list[str],
+                       columns: Optional[list[int]] = None) -> list[str]:
     """Extracts the text from text files.
     The function supports files with the extensions ".txt", ".csv", and ".tsv".
 
     Args:
         - text_file (str): The path of the text file to extract text from.
+        - columns (list[int]): Zero-based indexes of .csv and .tsv columns to extract,
+        all columns are extracted by default.
 
     Returns:
         - list[str]: Extracted text."""
@@ -24,19 +36,21 @@ def process_text_files(text_files: list[str]) -> list[str]:
     extracted_text: list[str] = []
 
     for text_file in text_files:
-        if text_file.endswith(".csv"):
-            extracted_text.extend(_process_csv(text_file))
+        extension = splitext(text_file)[1].lower()
+
+        if extension == ".csv":
+            extracted_text.extend(_process_csv(text_file, columns))
 
-        elif text_file.endswith(".tsv"):
-            extracted_text.extend(_process_tsv(text_file))
+        elif extension == ".tsv":
+            extracted_text.extend(_process_tsv(text_file, columns))
 
-        elif text_file.endswith(".xml"):
+        elif extension == ".xml":
             extracted_text.extend(_process_xml(text_file))
 
-        elif text_file.endswith(".html"):
+        elif extension == ".html":
             extracted_text.extend(_process_html(text_file))
 
-        elif text_file.endswith(".srt"):
+        elif extension == ".srt":
             tokenizer = load("tokenizers/punkt/english.pickle")
             extracted_text.extend(_process_srt(text_file, tokenizer))
 
@@ -70,44 +84,223 @@ def _default_file_process(file: str) -> list[str]:
     return []
 
 
-def _process_csv(file: str) -> list[str]:
-    """Extracts text from .csv files using stream processing.
+def _process_csv(file: str, columns: Optional[list[int]] = None) -> list[str]:
+    """Extracts text from .csv files.
 
     Args:
         - file (str): .csv file to be processed.
+        - columns (list[int]): Zero-based indexes of columns to extract, all by default.
 
     Returns:
         - list[str]: Extracted text."""
 
+    return _process_delimited(file, ",", columns)
+
+
+def _process_tsv(file: str, columns: Optional[list[int]] = None) -> list[str]:
+    """Extracts text from .tsv files.
+
+    Args:
+        - file (str): .tsv file to be processed.
+        - columns (list[int]): Zero-based indexes of columns to extract, all by default.
+
+    Returns:
+        - list[str]: Extracted text."""
+
+    return _process_delimited(file, "\t", columns)
+
+
+def _process_delimited(file: str, delimiter: str,
+                       columns: Optional[list[int]] = None) -> list[str]:
+    """Extracts text from delimited files column by column,
+    using pyarrow's multi-threaded columnar reader.
+    The first row is treated as a header: it is left out of type inference,
+    and its text is kept only for the columns that are extracted.
+    Columns containing only numbers, checked over the whole column, are skipped.
+    Falls back to stream processing for files pyarrow cannot parse,
+    e.g. ones with ragged rows or a misdetected encoding,
+    in which case the encoding is detected again from the whole file.
+
+    Args:
+        - file (str): Delimited file to be processed.
+        - delimiter (str): Character separating the values.
+        - columns (list[int]): Zero-based indexes of columns to extract, all by default.
+
+    Returns:
+        - list[str]: Extracted text."""
+
+    encoding = _detect_encoding(file)
+    parse_options = arrow_csv.ParseOptions(delimiter=delimiter, newlines_in_values=True)
+
+    try:
+        header, header_lines = _read_header(file, delimiter, encoding)
+        if header is None:
+            return []
+
+        read_options = arrow_csv.ReadOptions(encoding=encoding, skip_rows=header_lines,
+                                             autogenerate_column_names=True)
+
+        with arrow_csv.open_csv(file, read_options=read_options,
+                                parse_options=parse_options) as stream:
+            schema = stream.schema
+
+        selected = [(i, field) for i, field in enumerate(schema)
+                    if columns is None or i in columns]
+        numeric_columns = {field.name for _, field in selected if _is_numeric_type(field.type)}
+        table = _read_columns(file, read_options, parse_options,
+                              [field.name for _, field in selected], numeric_columns)
+
+    except (ArrowInvalid, UnicodeDecodeError):
+        return _stream_delimited(file, delimiter, _detect_full_encoding(file), columns)
+
     extracted_text: list[str] = []
+    for i, field in selected:
+        column = table.column(field.name)
+
+        if not arrow_types.is_string(column.type) or _is_numeric_column(column):
+            continue
 
-    with open(file, "r", newline="") as csv_file:
-        csv_reader = reader(csv_file)
-        for row in csv_reader:
-            extracted_text.extend(row)
+        if i < len(header):
+            extracted_text.append(header[i])
+        extracted_text.extend(column.to_pylist())
 
     return extracted_text
 
 
-def _process_tsv(file: str) -> list[str]:
-    """Extracts text from .tsv files using stream processing.
+def _read_columns(file: str, read_options: arrow_csv.ReadOptions,
+                  parse_options: arrow_csv.ParseOptions, names: list[str],
+                  numeric_columns: set[str]) -> Table:
+    """Reads the given columns of a delimited file.
+    Columns inferred as numeric from the first block are read as numbers,
+    which verifies them over the whole file without converting them to strings.
+    If any of them turns out to contain text further down, all columns are read as strings.
 
     Args:
-        - file (str): .tsv file to be processed.
+        - file (str): Delimited file to be processed.
+        - read_options (ReadOptions): pyarrow read options.
+        - parse_options (ParseOptions): pyarrow parse options.
+        - names (list[str]): Names of the columns to read.
+        - numeric_columns (set[str]): Names of the columns inferred as numeric.
+
+    Returns:
+        - Table: Columns that were read."""
+
+    def read(column_types: dict[str, DataType]) -> Table:
+        convert_options = arrow_csv.ConvertOptions(include_columns=names,
+                                                   column_types=column_types,
+                                                   null_values=[""],
+                                                   strings_can_be_null=False)
+
+        return arrow_csv.read_csv(file, read_options=read_options,
+                                  parse_options=parse_options,
+                                  convert_options=convert_options)
+
+    string_types = {name: arrow_string() for name in names}
+
+    if not numeric_columns:
+        return read(string_types)
+
+    try:
+        return read({**string_types, **{name: float64() for name in numeric_columns}})
+    except ArrowInvalid:
+        return read(string_types)
+
+
+def _read_header(file: str, delimiter: str,
+                 encoding: str) -> tuple[Optional[list[str]], int]:
+    """Reads the first record of a delimited file,
+    along with the number of lines it spans, as quoted values may contain newlines."""
+
+    with open(file, "r", newline="", encoding=encoding) as delimited_file:
+        rows = reader(delimited_file, delimiter=delimiter)
+        return next(rows, None), rows.line_num
+
+
+def _is_numeric_column(column: ChunkedArray) -> bool:
+    """Checks whether a column read as strings contains only numbers and empty cells."""
+
+    return pc.all(pc.match_substring_regex(column, _NUMERIC_PATTERN)).as_py() is not False
+
+
+def _stream_delimited(file: str, delimiter: str, encoding: str,
+                      columns: Optional[list[int]] = None) -> list[str]:
+    """Extracts text from delimited files using stream processing.
+
+    Args:
+        - file (str): Delimited file to be processed.
+        - delimiter (str): Character separating the values.
+        - encoding (str): Encoding of the file.
+        - columns (list[int]): Zero-based indexes of columns to extract, all by default.
 
     Returns:
         - list[str]: Extracted text."""
 
     extracted_text: list[str] = []
 
-    with open(file, "r", newline="") as tsv_file:
-        tsv_reader = reader(tsv_file, delimiter="\t")
-        for row in tsv_reader:
-            extracted_text.extend(row)
+    with open(file, "r", newline="", encoding=encoding, errors="replace") as delimited_file:
+        for row in reader(delimited_file, delimiter=delimiter):
+            if columns is None:
+                extracted_text.extend(row)
+            else:
+                extracted_text.extend(row[i] for i in columns if i < len(row))
 
     return extracted_text
 
 
+def _is_numeric_type(data_type: DataType) -> bool:
+    return (arrow_types.is_integer(data_type)
+            or arrow_types.is_floating(data_type)
+            or arrow_types.is_decimal(data_type))
+
+
+def _detect_encoding(file: str) -> str:
+    """Detects the encoding of a file from a sample of its beginning.
+
+    Args:
+        - file (str): File to be checked.
+
+    Returns:
+        - str: Detected encoding, UTF-8 if it could not be determined."""
+
+    with open(file, "rb") as f:
+        sample = f.read(ENCODING_SAMPLE_SIZE)
+
+    encoding = detect(sample)["encoding"]
+
+    if not encoding or encoding.lower() == "ascii":
+        return "utf8"
+
+    return encoding
+
+
+def _detect_full_encoding(file: str) -> str:
+    """Detects the encoding of a file from all of its contents,
+    for files whose beginning was not enough to tell.
+
+    Args:
+        - file (str): File to be checked.
+
+    Returns:
+        - str: First detected encoding the file can be decoded with, Windows-1252 if none."""
+
+    with open(file, "rb") as f:
+        file_data = f.read()
+
+    for data in detect_all(file_data):
+        encoding = data["encoding"]
+        if not encoding:
+            continue
+
+        try:
+            file_data.decode(encoding)
+            return encoding
+
+        except (UnicodeDecodeError, LookupError):
+            continue
+
+    return "cp1252"
+
+
 def _process_xml(file: str) -> list[str]:
     """Extracts text from an XML file and removes tags.
 
@@ -0,0 +1,202 @@
+"""This module provides functions for saving reports grouped by language.
+
+Rows are sorted by their prediction, and optionally by their source, using an external merge sort:
+sorted runs of a bounded size are written to disk, and then merged while streaming the output,
+so the sort itself needs a bounded amount of memory regardless of the size of the report.
+Each language is saved to its own Excel file, written in constant memory mode."""
+
+import json
+from datetime import datetime
+from heapq import merge
+from itertools import groupby, repeat
+from operator import itemgetter
+from os import makedirs
+from os.path import join
+from tempfile import TemporaryDirectory
+from typing import Generator, Hashable, Iterable, Optional
+from pandas import Series
+from xlsxwriter import Workbook
+from text_processing import save_report
+
+
+# Number of rows sorted in memory at once.
+RUN_SIZE = 200_000
+# Maximum number of runs merged at once, larger numbers of runs are merged in several passes.
+MAX_OPEN_RUNS = 64
+# Maximum number of rows written to a single worksheet.
+ROWS_PER_SHEET = 750_000
+
+# Prediction, source, extraction order, and text of a single row.
+# The source is left empty unless rows are sorted by it.
+_Row = tuple[str, str, int, str]
+
+
+def save_selected_report(processed_text: Series, predictions: Optional[Series],
+                         options: dict[str, bool], created: Optional[datetime] = None) -> None:
+    """Saves the report either in extraction order, or grouped by language,
+    one file per language, depending on the advanced options selected by the user.
+    The index of the processed text is used as the source of each row.
+
+    Args:
+        - processed_text (Series): Extracted and processed text.
+        - predictions (Series): Language predictions, None if no language detection was performed.
+        - options (dict[str, bool]): Advanced options selected by the user.
+        - created (datetime): Creation time stored in the report's metadata,
+        current time by default."""
+
+    if predictions is not None and options.get("Group report by language", False):
+        save_grouped_report(predictions, processed_text, processed_text.index,
+                            by_source=options.get("Sort grouped report by file", False),
+                            created=created)
+    else:
+        save_report(processed_text, predictions, created)
+
+
+def save_grouped_report(predictions: Iterable[str], processed_text: Iterable[str],
+                        sources: Optional[Iterable[Hashable]] = None, output_dir: str = ".",
+                        by_source: bool = False,
+                        created: Optional[datetime] = None) -> dict[str, int]:
+    """Saves extracted text grouped by its language prediction, one Excel file per language.
+    Within each language, rows keep their extraction order, unless they are sorted by source.
+
+    Args:
+        - predictions (Iterable[str]): Language predictions, one per processed text entry.
+        - processed_text (Iterable[str]): Extracted and processed text.
+        - sources (Iterable[Hashable]): Source of each processed text entry, e.g. its file path.
+        - output_dir (str): Directory the per-language files are saved to.
+        - by_source (bool): Whether to also sort rows by their source within each language,
+        and save the source of each row next to its text. Requires sources.
+        - created (datetime): Creation time stored in the files' metadata, current time by default.
+
+    Returns:
+        - dict[str, int]: Number of rows saved for each language."""
+
+    if by_source and sources is None:
+        raise ValueError("Sources are required to sort rows by their source.")
+
+    if not by_source or sources is None:
+        sources = repeat("")
+
+    rows = ((str(prediction), str(source), i, text) for i, (prediction, source, text)
+            in enumerate(zip(predictions, sources, processed_text)))
+
+    makedirs(output_dir, exist_ok=True)
+
+    with TemporaryDirectory() as temp_dir:
+        runs = _write_runs(rows, temp_dir)
+        row_counts = _write_language_files(_merge_runs(runs, temp_dir),
+                                           output_dir, by_source, created)
+
+    for language, count in row_counts.items():
+        print(f"{language}: {count} rows")
+
+    return row_counts
+
+
+def _write_runs(rows: Iterable[_Row], temp_dir: str) -> list[str]:
+    """Splits the rows into runs of RUN_SIZE rows, sorts each run, and writes it to disk.
+
+    Args:
+        - rows (Iterable[_Row]): Rows to sort.
+        - temp_dir (str): Directory the runs are written to.
+
+    Returns:
+        - list[str]: File paths of the written runs."""
+
+    runs: list[str] = []
+    run: list[_Row] = []
+
+    for row in rows:
+        run.append(row)
+
+        if len(run) == RUN_SIZE:
+            runs.append(_write_run(sorted(run), temp_dir, str(len(runs))))
+            run = []
+
+    if run:
+        runs.append(_write_run(sorted(run), temp_dir, str(len(runs))))
+
+    return runs
+
+
+def _merge_runs(runs: list[str], temp_dir: str) -> Generator[_Row, None, None]:
+    """Merges sorted runs into a single sorted stream of rows.
+    If there are more than MAX_OPEN_RUNS runs, they are first merged into larger runs.
+
+    Args:
+        - runs (list[str]): File paths of the sorted runs.
+        - temp_dir (str): Directory intermediate runs are written to.
+
+    Returns:
+        - _Row: Rows in sorted order."""
+
+    merged_runs = 0
+    while len(runs) > MAX_OPEN_RUNS:
+        next_runs = []
+        for start in range(0, len(runs), MAX_OPEN_RUNS):
+            group = runs[start:start + MAX_OPEN_RUNS]
+            merged = merge(*(_read_run(run) for run in group))
+            next_runs.append(_write_run(merged, temp_dir, f"merged{merged_runs}"))
+            merged_runs += 1
+
+        runs = next_runs
+
+    yield from merge(*(_read_run(run) for run in runs))
+
+
+def _write_run(rows: Iterable[_Row], temp_dir: str, name: str) -> str:
+    path = join(temp_dir, f"run{name}.jsonl")
+
+    with open(path, "w", encoding="utf-8") as run_file:
+        for row in rows:
+            run_file.write(json.dumps(row, ensure_ascii=False))
+            run_file.write("\n")
+
+    return path
+
+
+def _read_run(path: str) -> Generator[_Row, None, None]:
+    with open(path, "r", encoding="utf-8") as run_file:
+        for line in run_file:
+            yield tuple(json.loads(line))
+
+
+def _write_language_files(rows: Iterable[_Row], output_dir: str, by_source: bool,
+                          created: Optional[datetime] = None) -> dict[str, int]:
+    """Writes sorted rows to one Excel file per language, in constant memory mode.
+    Every ROWS_PER_SHEET rows, a new worksheet is started.
+
+    Args:
+        - rows (Iterable[_Row]): Rows sorted by their prediction.
+        - output_dir (str): Directory the files are saved to.
+        - by_source (bool): Whether to include the source of each row.
+        - created (datetime): Creation time stored in the files' metadata.
+
+    Returns:
+        - dict[str, int]: Number of rows written for each language."""
+
+    row_counts: dict[str, int] = {}
+
+    for prediction, language_rows in groupby(rows, key=itemgetter(0)):
+        with Workbook(join(output_dir, f"{prediction}.xlsx"),
+                      {"constant_memory": True}) as workbook:
+            if created:
+                workbook.set_properties({"created": created})
+
+            worksheet = workbook.add_worksheet()
+            count = 0
+
+            for _, source, _, text in language_rows:
+                row = count % ROWS_PER_SHEET
+                if count and row == 0:
+                    worksheet = workbook.add_worksheet()
+
+                worksheet.write_string(row, 0, text)
+                if by_source:
+                    worksheet.write_string(row, 1, source)
+
+                count += 1
+
+        row_counts[prediction] = count
+
+    return row_counts
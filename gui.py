@@ -18,9 +18,42 @@ ADVANCED_OPTIONS = {
     "Remove measurements":
     "Can speed up the process by removing SI units and measurements from extracted text.",
     "Remove hyperlinks":
-    "Can speed up the process by removing hyperlinks from extracted text."
+    "Can speed up the process by removing hyperlinks from extracted text.",
+    "Collapse near-duplicates":
+    ("Can greatly speed up language detection by detecting segments that differ only in "
+     "digits, case, punctuation, or whitespace once, and sharing that prediction."),
+    "Remove PDF boilerplate":
+    ("Can greatly speed up the process by removing running headers, footers, page numbers, "
+     "and other text repeated across the pages of a PDF file, keeping only its first occurrence."),
+    "Fast PDF extraction":
+    ("Can greatly speed up PDF processing by skipping layout sorting and sentence tokenization. "
+     "Each text block becomes a segment, so segments may span several sentences."),
+    "Use detection server":
+    ("Sends text to an already running local detection server (detection_server.py), "
+     "which keeps language models loaded between runs. Falls back to local detection if unavailable."),
+    "Per-file language prior":
+    ("Can greatly speed up language detection of mostly monolingual files by detecting their "
+     "dominant language from a sample, and assigning it to all segments except for outliers."),
+    "Merge short segments":
+    ("Speeds up and improves language detection of titles, list items, table cells, and subtitles "
+     "by detecting consecutive short segments of a file together."),
+    "Sample long segments":
+    ("Can speed up language detection of long paragraphs by detecting them from a sample "
+     "of their text, falling back to the full text when the sample is inconclusive."),
+    "Group report by language":
+    ("Saves the text of each language to its own Excel file, instead of a single report "
+     "in extraction order. Rows are sorted on disk, so grouping adds little memory use."),
+    "Sort grouped report by file":
+    ("When grouping the report by language, also sorts each language's rows by their file, "
+     "and saves the file path next to each row.")
 }
 
+# Options that change the output, rather than only speed up the process, are unchecked by default.
+OPT_IN_OPTIONS = {"Collapse near-duplicates", "Remove PDF boilerplate", "Fast PDF extraction",
+                  "Use detection server", "Per-file language prior", "Merge short segments",
+                  "Sample long segments", "Group report by language",
+                  "Sort grouped report by file"}
+
 
 class _MainWindow(QWidget):
     """Custom searchable widget for displaying and selecting multiple languages."""
@@ -122,7 +155,8 @@ class _MainWindow(QWidget):
 
         self.checkbox_data = ADVANCED_OPTIONS
         for label, tooltip_text in self.checkbox_data.items():
-            checkbox = _CheckBox(self, label, tooltip_text)
+            checkbox = _CheckBox(self, label, tooltip_text,
+                                 checked=label not in OPT_IN_OPTIONS)
             self.checkboxes_layout.addWidget(checkbox)
 
     def _get_selected_settings(self) -> dict[str, bool]:
@@ -1,32 +1,498 @@
-"""This module provides functions for detecting the language of given text."""
+"""This module provides functions for detecting the language of given text.
 
-from lingua import Language, LanguageDetectorBuilder
+Detection is performed locally by default, but it can also be delegated to
+a local detection server (see detection_server.py) that keeps detectors loaded
+between runs, and shares them between concurrent jobs."""
+
+import json
+import unicodedata
+from collections import Counter, defaultdict
+from os import environ
+from functools import partial
+from typing import Callable, Hashable, Optional, Sequence, Union
+from urllib.request import Request, urlopen
+from lingua import Language, LanguageDetector, LanguageDetectorBuilder
 from pandas import Series
 from alive_progress import alive_bar
+from text_processing import normalize_segment
+
+
+DETECTION_SERVER_HOST = "127.0.0.1"
+DETECTION_SERVER_PORT = 8765
+# Number of segments sent to the detection server in a single request.
+_CLIENT_BATCH_SIZE = 10_000
+# Seconds to wait for the detection server to answer a single request.
+_CLIENT_TIMEOUT = 600
+# Environment variable overriding the address of the detection server, e.g. "127.0.0.1:9000".
+DETECTION_SERVER_ENV = "LINGUASORT_DETECTION_SERVER"
+
+# Files with fewer segments than this are always detected segment by segment.
+PRIOR_MIN_SEGMENTS = 50
+# Number of evenly spaced segments used to detect a file's dominant language.
+PRIOR_SAMPLE_SIZE = 40
+# Share of the sampled segments that have to be confidently detected as the dominant language.
+PRIOR_AGREEMENT = 0.9
+# Minimum confidence of a prediction for it to be considered confident.
+MIN_CONFIDENCE = 0.7
+# Segments with fewer letters than this are detected individually.
+# Letters are counted rather than words, as some scripts, e.g. Chinese or Thai, do not use spaces.
+PRIOR_MIN_LETTERS = 15
+# Segments with a larger share of digits than this are detected individually.
+PRIOR_MAX_DIGIT_SHARE = 0.3
+
+# Segments with at most this many words, and at most this many characters,
+# are merged into context windows. The latter also limits scripts that do not use spaces.
+SHORT_SEGMENT_MAX_WORDS = 4
+SHORT_SEGMENT_MAX_LENGTH = 30
+# Maximum number of consecutive short segments merged into a single context window.
+MAX_WINDOW_SEGMENTS = 8
+# Minimum number of consecutive short segments merged into a context window.
+MIN_WINDOW_SEGMENTS = 3
 
+# Segments longer than this many characters are detected from a sample of their text,
+# several times the length of the sample itself, so sampling always skips most of the text.
+MAX_SEGMENT_LENGTH = 2_000
+# Number of evenly spaced excerpts a long segment's sample consists of, and their length.
+SAMPLE_EXCERPTS = 4
+SAMPLE_EXCERPT_LENGTH = 100
 
-def detect_language(text_to_check: Series, languages: list[Language]) -> Series:
+# Detects the language of every given text, one prediction per text.
+_DetectFunction = Callable[[list[str]], list[str]]
+
+
+def detect_language(text_to_check: Series, languages: list[Language],
+                    options: Optional[dict[str, bool]] = None,
+                    sources: Optional[Sequence[Hashable]] = None,
+                    detect_pending: Optional[Callable[[_DetectFunction, list[str]],
+                                                      list[str]]] = None) -> Series:
     """Performs the language detection process on the given text.
+    Passes that look across segments run first, over all of the text,
+    and the remaining segments are then detected one by one.
 
     Args:
         - text_to_check (Series): Strings to perform the check on
         - languages(list[str]): Languages selected by the user,
         representing the languages selected by the user.
+        - options (dict[str, bool]): Advanced options selected by the user.
+        - sources (Sequence[Hashable]): Source file of each string,
+        used by the per-file language prior and to keep context windows within a single file.
+        - detect_pending (Callable): Called with the detect function and the remaining texts
+        instead of detecting them directly, e.g. to checkpoint the detection in batches.
 
     Returns:
         - Series: Containing all language predictions"""
 
-    detector = LanguageDetectorBuilder.from_languages(*languages).build()
-    predictions = []
+    options = options or {}
+    texts: list[str] = list(text_to_check)
+    detection = _select_detection(languages, options.get("Use detection server", False),
+                                  options.get("Sample long segments", False))
+    predictions: list[Optional[str]] = [None] * len(texts)
+
+    if options.get("Per-file language prior", False) and sources is not None:
+        _apply_dominant_languages(detection, texts, list(sources), predictions)
+
+    if options.get("Merge short segments", False):
+        _apply_context_windows(detection, texts,
+                               list(sources) if sources is not None else [None] * len(texts),
+                               predictions)
+
+    pending = [i for i, prediction in enumerate(predictions) if prediction is None]
+    pending_texts = [texts[i] for i in pending]
+
+    detect: _DetectFunction = detection.detect
+    if detect_pending is not None:
+        detect = partial(detect_pending, detection.detect)
+
+    if options.get("Collapse near-duplicates", False):
+        pending_predictions = _detect_near_duplicate_groups(detect, pending_texts)
+    else:
+        pending_predictions = detect(pending_texts)
+
+    for i, prediction in zip(pending, pending_predictions):
+        predictions[i] = prediction
+
+    return Series(predictions)
+
+
+def predict_language(detector: LanguageDetector, text: str) -> str:
+    """Detects the language of a single text.
+
+    Args:
+        - detector (LanguageDetector): Detector used for the prediction.
+        - text (str): Text to perform the check on.
+
+    Returns:
+        - str: Formatted language prediction."""
+
+    return _format_prediction_output(str(detector.detect_language_of(text)))
+
+
+def predict_language_sampled(detector: LanguageDetector, text: str) -> str:
+    """Detects the language of a single text, using only a sample of it if it is long.
+    The full text is used if the sample's prediction is not confident.
+
+    Args:
+        - detector (LanguageDetector): Detector used for the prediction.
+        - text (str): Text to perform the check on.
+
+    Returns:
+        - str: Formatted language prediction."""
+
+    if len(text) <= MAX_SEGMENT_LENGTH:
+        return predict_language(detector, text)
+
+    language, confidence = predict_language_with_confidence(detector, _sample_text(text))
+
+    if language != "None" and confidence >= MIN_CONFIDENCE:
+        return language
+
+    return predict_language(detector, text)
+
+
+def predict_language_with_confidence(detector: LanguageDetector, text: str) -> tuple[str, float]:
+    """Detects the most likely language of a single text, along with its confidence.
+
+    Args:
+        - detector (LanguageDetector): Detector used for the prediction.
+        - text (str): Text to perform the check on.
+
+    Returns:
+        - str: Formatted language prediction.
+        - float: Confidence of the prediction, between 0 and 1."""
+
+    confidence_values = detector.compute_language_confidence_values(text)
+
+    if not confidence_values:
+        return "None", 0.0
+
+    top = confidence_values[0]
+
+    return _format_prediction_output(str(top.language)), top.value
+
+
+class _LocalDetection:
+    """Performs the detection using a detector built in this process."""
+
+    def __init__(self, languages: list[Language], sample_long_segments: bool = False) -> None:
+        self.detector = LanguageDetectorBuilder.from_languages(*languages).build()
+        self.predict = predict_language_sampled if sample_long_segments else predict_language
+
+    def detect(self, texts: list[str]) -> list[str]:
+        """Runs the detector once on every given text.
+
+        Args:
+            - texts (list[str]): Texts to perform the check on.
+
+        Returns:
+            - list[str]: Formatted language predictions, one per text."""
+
+        predictions = []
+
+        with alive_bar(total=len(texts),
+                       spinner="classic",
+                       title="Language detection:") as progress_bar:
+            for text in texts:
+                predictions.append(self.predict(self.detector, text))
+                progress_bar()  # pylint: disable=not-callable
+
+        return predictions
+
+    def detect_with_confidence(self, texts: list[str]) -> list[tuple[str, float]]:
+        return [predict_language_with_confidence(self.detector, text) for text in texts]
+
+
+class _RemoteDetection:
+    """Performs the detection by sending texts to the local detection server in batches.
+    If the server fails or becomes unreachable, the remaining batches are detected locally."""
+
+    def __init__(self, server_url: str, languages: list[Language],
+                 sample_long_segments: bool = False) -> None:
+        self.server_url = server_url
+        self.languages = languages
+        self.language_names = [language.name for language in languages]
+        self.sample_long_segments = sample_long_segments
+        self.fallback: Optional[_LocalDetection] = None
+
+    def detect(self, texts: list[str]) -> list[str]:
+        """Sends every given text to the detection server.
+
+        Args:
+            - texts (list[str]): Texts to perform the check on.
+
+        Returns:
+            - list[str]: Formatted language predictions, one per text."""
+
+        predictions: list[str] = []
+
+        with alive_bar(total=len(texts),
+                       spinner="classic",
+                       title="Language detection (server):") as progress_bar:
+            for start in range(0, len(texts), _CLIENT_BATCH_SIZE):
+                batch = texts[start:start + _CLIENT_BATCH_SIZE]
+                predictions.extend(self._detect_batch(batch, confidence=False))
+                progress_bar(len(batch))  # pylint: disable=not-callable
+
+        return predictions
+
+    def detect_with_confidence(self, texts: list[str]) -> list[tuple[str, float]]:
+        predictions: list[tuple[str, float]] = []
+        for start in range(0, len(texts), _CLIENT_BATCH_SIZE):
+            batch = texts[start:start + _CLIENT_BATCH_SIZE]
+            predictions.extend((language, value)
+                               for language, value in self._detect_batch(batch, confidence=True))
+
+        return predictions
+
+    def _detect_batch(self, texts: list[str], confidence: bool) -> list:
+        """Sends a single batch to the detection server,
+        or detects it locally once the server has failed."""
+
+        if self.fallback is None:
+            try:
+                return self._send(texts, confidence)
+
+            except OSError as error:
+                print(f"Detection server failed ({error}), "
+                      "detecting the remaining segments locally.")
+                self.fallback = _LocalDetection(self.languages, self.sample_long_segments)
+
+        if confidence:
+            return self.fallback.detect_with_confidence(texts)
+
+        return [self.fallback.predict(self.fallback.detector, text) for text in texts]
+
+    def _send(self, texts: list[str], confidence: bool) -> list:
+        body = json.dumps({"languages": self.language_names,
+                           "texts": texts,
+                           "confidence": confidence,
+                           "sample_long": self.sample_long_segments})
+        request = Request(f"{self.server_url}/detect", data=body.encode("utf-8"),
+                          headers={"Content-Type": "application/json"})
+
+        with urlopen(request, timeout=_CLIENT_TIMEOUT) as response:
+            return json.load(response)["predictions"]
+
+
+_Detection = Union[_LocalDetection, _RemoteDetection]
+
+
+def _select_detection(languages: list[Language], use_server: bool,
+                      sample_long_segments: bool = False) -> _Detection:
+    """Selects where the detection is performed.
+    The detection server is used if requested and available,
+    otherwise a local detector is built.
+    The server's address can be overridden with the DETECTION_SERVER_ENV environment variable.
+
+    Args:
+        - languages (list[Language]): Languages selected by the user.
+        - use_server (bool): Whether to use the local detection server.
+        - sample_long_segments (bool): Whether to detect long segments from a sample of their text.
+
+    Returns:
+        - _Detection: Object performing the detection."""
+
+    if use_server:
+        server_url = "http://" + environ.get(DETECTION_SERVER_ENV,
+                                             f"{DETECTION_SERVER_HOST}:{DETECTION_SERVER_PORT}")
+
+        if _is_server_available(server_url):
+            return _RemoteDetection(server_url, languages, sample_long_segments)
+
+        print(f"Detection server is not available at {server_url}, detecting locally.")
+
+    return _LocalDetection(languages, sample_long_segments)
+
+
+def _is_server_available(server_url: str) -> bool:
+    try:
+        with urlopen(f"{server_url}/health", timeout=1):
+            return True
+
+    except OSError:
+        return False
+
+
+def _apply_dominant_languages(detection: _Detection,
+                              texts: list[str], sources: list[Hashable],
+                              predictions: list[Optional[str]]) -> None:
+    """Detects the dominant language of each source file from a sample of its segments.
+    Only segments the prior can be assigned to are sampled, i.e. ones that are neither
+    short nor mostly numeric, and are written in an identifiable script.
+    Confident predictions of the sampled segments are kept as they are.
+    If the dominant language is detected confidently, it is assigned to all eligible segments
+    of the file, except for outliers, which are left to be detected individually:
+    segments written in a different script, and sampled segments detected with low confidence.
+
+    Args:
+        - detection (_Detection): Object performing the detection.
+        - texts (list[str]): Texts to perform the check on.
+        - sources (list[Hashable]): Source file of each text.
+        - predictions (list[Optional[str]]): Predictions, filled in place for assigned segments."""
+
+    positions_by_source: dict[Hashable, list[int]] = defaultdict(list)
+    scripts: dict[int, Optional[str]] = {}
+    for i, (text, source) in enumerate(zip(texts, sources)):
+        if not _is_short_or_numeric(text):
+            scripts[i] = _get_script(text)
+            if scripts[i] is not None:
+                positions_by_source[source].append(i)
+
+    for source, positions in positions_by_source.items():
+        if len(positions) < PRIOR_MIN_SEGMENTS:
+            continue
+
+        step = len(positions) / PRIOR_SAMPLE_SIZE
+        sample = [positions[int(i * step)] for i in range(PRIOR_SAMPLE_SIZE)]
+        sample_predictions = detection.detect_with_confidence([texts[i] for i in sample])
+
+        confident = {i: language for i, (language, confidence) in zip(sample, sample_predictions)
+                     if language != "None" and confidence >= MIN_CONFIDENCE}
+        for i, language in confident.items():
+            predictions[i] = language
+
+        if not confident:
+            continue
+
+        dominant_language, count = Counter(confident.values()).most_common(1)[0]
+        if count < PRIOR_AGREEMENT * PRIOR_SAMPLE_SIZE:
+            continue
+
+        dominant_script = Counter(scripts[i] for i in sample).most_common(1)[0][0]
+        sampled = set(sample)
+
+        assigned = 0
+        for i in positions:
+            if i not in sampled and scripts[i] == dominant_script:
+                predictions[i] = dominant_language
+                assigned += 1
+
+        print(f"{source}: dominant language {dominant_language}, "
+              f"{assigned + len(confident) - len(sample)} of {len(positions)} "
+              f"detector calls saved.")
+
+
+def _sample_text(text: str) -> str:
+    """Builds a bounded sample of a long text from evenly spaced excerpts,
+    each trimmed to whole words where possible."""
+
+    excerpts = []
+    step = (len(text) - SAMPLE_EXCERPT_LENGTH) / max(SAMPLE_EXCERPTS - 1, 1)
+
+    for i in range(SAMPLE_EXCERPTS):
+        start = int(i * step)
+        end = start + SAMPLE_EXCERPT_LENGTH
+
+        if start > 0 and not text[start - 1].isspace():
+            word_start = text.find(" ", start, end)
+            start = word_start + 1 if word_start != -1 else start
+
+        if end < len(text) and not text[end].isspace():
+            word_end = text.rfind(" ", start, end)
+            end = word_end if word_end > start else end
+
+        excerpts.append(text[start:end])
+
+    return " ".join(excerpts)
+
+
+def _get_script(text: str) -> Optional[str]:
+    """Determines the script most letters of the text are written in, e.g. "LATIN"."""
+
+    scripts = Counter(unicodedata.name(character, "").split(" ")[0]
+                      for character in text if character.isalpha())
+
+    return scripts.most_common(1)[0][0] if scripts else None
+
+
+def _is_short_or_numeric(text: str) -> bool:
+    letters = sum(character.isalpha() for character in text)
+    digits = sum(character.isdigit() for character in text)
+
+    return (letters < PRIOR_MIN_LETTERS
+            or digits > PRIOR_MAX_DIGIT_SHARE * (letters + digits))
+
+
+def _apply_context_windows(detection: _Detection, texts: list[str],
+                           sources: list[Hashable], predictions: list[Optional[str]]) -> None:
+    """Merges consecutive short segments from the same source file into context windows,
+    and detects the language of each window from its two halves.
+    If both halves are detected confidently as the same language, it is assigned to all
+    of the window's segments, otherwise the window is considered mixed,
+    and its segments are left to be detected individually.
+
+    Args:
+        - detection (_Detection): Object performing the detection.
+        - texts (list[str]): Texts to perform the check on.
+        - sources (list[Hashable]): Source file of each text.
+        - predictions (list[Optional[str]]): Predictions, filled in place for assigned segments."""
+
+    windows: list[list[int]] = []
+    window: list[int] = []
+
+    for i, text in enumerate(texts):
+        is_short = (predictions[i] is None and len(text) <= SHORT_SEGMENT_MAX_LENGTH
+                    and len(text.split()) <= SHORT_SEGMENT_MAX_WORDS)
+
+        if window and (not is_short or sources[i] != sources[window[0]]
+                       or len(window) == MAX_WINDOW_SEGMENTS):
+            windows.append(window)
+            window = []
+
+        if is_short:
+            window.append(i)
+
+    windows.append(window)
+    # Each window costs two detector calls, so smaller windows would not save any.
+    windows = [window for window in windows if len(window) >= MIN_WINDOW_SEGMENTS]
+
+    halves = [half for window in windows
+              for half in (window[:len(window) // 2], window[len(window) // 2:])]
+    half_predictions = detection.detect_with_confidence(
+        ["\n".join(texts[i] for i in half) for half in halves])
+
+    merged = 0
+    mixed = 0
+    for window, (language, confidence), (other_language, other_confidence) in zip(
+            windows, half_predictions[0::2], half_predictions[1::2]):
+        if (language == "None" or language != other_language
+                or min(confidence, other_confidence) < MIN_CONFIDENCE):
+            mixed += 1
+            continue
+
+        for i in window:
+            predictions[i] = language
+        merged += len(window)
+
+    print(f"Context windows: {merged} short segments detected in {len(windows) - mixed} windows, "
+          f"{mixed} mixed windows detected segment by segment, "
+          f"{merged - len(halves)} detector calls saved.")
+
+
+def _detect_near_duplicate_groups(detect: _DetectFunction,
+                                  texts: list[str]) -> list[str]:
+    """Groups texts by their normalization key and runs the detection
+    only once per group, on its first member.
+    The prediction is then shared by every member of the group.
+
+    Args:
+        - detect (_DetectFunction): Function performing the detection.
+        - texts (list[str]): Texts to perform the check on.
+
+    Returns:
+        - list[str]: Formatted language predictions, one per text."""
+
+    keys = [normalize_segment(text) for text in texts]
+    representatives: dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        representatives.setdefault(key, text)
+
+    group_predictions = dict(zip(representatives.keys(),
+                                 detect(list(representatives.values()))))
 
-    with alive_bar(total=len(text_to_check),
-                   spinner="classic",
-                   title="Language detection:") as progress_bar:
-        for text in text_to_check:
-            predictions.append(str(detector.detect_language_of(text)))
-            progress_bar()  # pylint: disable=not-callable
+    print(f"Near-duplicate collapsing avoided {len(texts) - len(representatives)} "
+          f"of {len(texts)} detector calls.")
 
-    return Series(map(_format_prediction_output, predictions))
+    return [group_predictions[key] for key in keys]
 
 
 def _format_prediction_output(prediction: str):
@@ -9,15 +9,30 @@ The following file formats are currently supported:
 - XML and HTML (.xml and .html)
 - Subtitles (.srt)"""
 
+from typing import Optional
 from gui import settings_selection
-from file_utils.file_processing import browse_files, process_files
-from text_processing import process_text, save_report
+from file_utils.file_processing import browse_files, flatten_by_source, process_files_by_source
+from text_processing import process_text
 from language_detect import detect_language
+from checkpoint import create_job, get_job_options, has_job, run_job
+from grouped_report import save_selected_report
 
 
-def lingua_sorter():
+def lingua_sorter(checkpoint_dir: Optional[str] = None,
+                  pdf_page_range: Optional[tuple[int, int]] = None):
     """GUI-based library LinguaSort is a Python library designed to simplify text extraction
-    from various file formats and/or organize the extracted text based on language."""
+    from various file formats and/or organize the extracted text based on language.
+
+    Args:
+        - checkpoint_dir (str): Directory used to checkpoint the job's progress.
+        If it already contains a job, that job is resumed without asking for settings or files.
+        - pdf_page_range (tuple[int, int]): Zero-based start and end-exclusive stop
+        of the pages to extract from each PDF file, all pages are extracted by default."""
+
+    if checkpoint_dir and has_job(checkpoint_dir):
+        processed_text, predictions, created = run_job(checkpoint_dir)
+        save_selected_report(processed_text, predictions, get_job_options(checkpoint_dir), created)
+        return
 
     selected_languages, options, operation_type = settings_selection()
 
@@ -25,16 +40,26 @@ def lingua_sorter():
         return
 
     files = browse_files()
-    extracted_text = process_files(files)
-    processed_text = process_text(extracted_text, options)
+
+    if checkpoint_dir:
+        languages = selected_languages if operation_type == "language_check" else None
+        create_job(checkpoint_dir, files, options, languages, pdf_page_range)
+        processed_text, predictions, created = run_job(checkpoint_dir)
+        save_selected_report(processed_text, predictions, options, created)
+        return
+
+    extracted_text, sources = flatten_by_source(process_files_by_source(files, options,
+                                                                           pdf_page_range))
+    processed_text = process_text(extracted_text, options, sources)
 
     if operation_type == "language_check":
-        predictions = detect_language(processed_text, selected_languages)
+        predictions = detect_language(processed_text, selected_languages, options,
+                                      processed_text.index)
 
     elif operation_type == "text_extraction":
         predictions = None
 
-    save_report(processed_text, predictions)
+    save_selected_report(processed_text, predictions, options)
 
 
 if __name__ == "__main__":
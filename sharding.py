@@ -0,0 +1,258 @@
+"""This module provides functions for splitting a single job across several machines.
+
+A job is planned once, which writes a shard manifest: the files to process,
+the selected options and languages, and a deterministic assignment of files to shards,
+balanced by file size or page count.
+Each shard is then processed independently, on any machine with access to a shared filesystem,
+and its results are written next to the manifest.
+Finally, the results of all shards are merged into a single report,
+with the same rows, in the same order, as a single-machine run would have produced.
+
+Usage, from the repository root:
+    python sharding.py plan job.json --shards 4 --languages ENGLISH GERMAN -- file1.pdf ...
+    python sharding.py plan job.json --shards 4 --option "Remove repetitions=false" -- ...
+    python sharding.py run job.json 0    (once per shard, on any machine)
+    python sharding.py merge job.json
+
+Note: repetitions are only removed across shards when merging, after the language detection.
+Because of this, with the "Collapse near-duplicates", "Per-file language prior",
+or "Merge short segments" options, some predictions may differ
+from those of a single-machine run."""
+
+import json
+from argparse import ArgumentParser
+from heapq import heapify, heapreplace
+from os import replace
+from os.path import abspath, getsize, splitext
+from typing import Optional
+from fitz import Document
+from lingua import Language
+from pandas import Series
+from file_utils.file_processing import flatten_by_source, order_files, process_files_by_source
+from text_processing import process_text
+from language_detect import detect_language
+from grouped_report import save_selected_report
+
+
+# Used to estimate the page count of non-PDF files when balancing shards by page count.
+BYTES_PER_PAGE_ESTIMATE = 4_000
+
+
+def write_shard_manifest(manifest_path: str, files: list[str], shard_count: int,
+                         options: dict[str, bool], languages: Optional[list[Language]] = None,
+                         balance_by: str = "size",
+                         pdf_page_range: Optional[tuple[int, int]] = None) -> list[list[str]]:
+    """Assigns files to shards and writes the shard manifest.
+    Files are assigned from the heaviest to the lightest, each to the currently lightest shard,
+    so the same input always results in the same manifest.
+
+    Args:
+        - manifest_path (str): Path of the manifest to write.
+        - files (list[str]): File paths to process, accessible from all machines.
+        - shard_count (int): Number of shards to split the files into.
+        - options (dict[str, bool]): Advanced options selected by the user.
+        - languages (list[Language]): Languages to detect between,
+        no language detection is performed if not given.
+        - balance_by (str): Either "size" or "pages".
+        - pdf_page_range (tuple[int, int]): Zero-based start and end-exclusive stop
+        of the pages to extract from each PDF file, all pages are extracted by default.
+
+    Returns:
+        - list[list[str]]: Files assigned to each shard."""
+
+    if shard_count < 1:
+        raise ValueError(f"shard_count must be at least 1, not {shard_count}.")
+
+    if balance_by not in ("size", "pages"):
+        raise ValueError(f'balance_by must be either "size" or "pages", not "{balance_by}".')
+
+    files = [abspath(file) for file in files]
+    ordered_files = order_files(files)
+
+    for file in sorted(set(files) - set(ordered_files)):
+        print(f"Skipping {file}, its file format is not supported.")
+    weights = [_get_weight(file, balance_by) for file in ordered_files]
+
+    positions: list[list[int]] = [[] for _ in range(shard_count)]
+    loads = [(0, shard) for shard in range(shard_count)]
+    heapify(loads)
+
+    for position in sorted(range(len(ordered_files)), key=lambda i: (-weights[i], i)):
+        load, shard = loads[0]
+        positions[shard].append(position)
+        heapreplace(loads, (load + weights[position], shard))
+
+    shards = [[ordered_files[i] for i in sorted(shard)] for shard in positions]
+    manifest = {
+        "files": ordered_files,
+        "options": options,
+        "languages": [language.name for language in languages] if languages else None,
+        "pdf_page_range": list(pdf_page_range) if pdf_page_range else None,
+        "shards": shards,
+    }
+    _write_json(manifest_path, manifest)
+
+    return shards
+
+
+def run_shard(manifest_path: str, shard: int) -> None:
+    """Extracts, processes, and detects the language of the text of a single shard's files.
+    The results are written next to the manifest.
+
+    Args:
+        - manifest_path (str): Path of the shard manifest.
+        - shard (int): Index of the shard to run."""
+
+    manifest = _read_json(manifest_path)
+    options: dict[str, bool] = manifest["options"]
+
+    pdf_page_range = manifest.get("pdf_page_range")
+    pdf_page_range = tuple(pdf_page_range) if pdf_page_range else None
+
+    files_text = []
+    for file, extracted_text in process_files_by_source(manifest["shards"][shard], options,
+                                                        pdf_page_range):
+        files_text.append((file, process_text(extracted_text, options).tolist()))
+
+    predictions: list[Optional[str]] = [None] * sum(len(text) for _, text in files_text)
+    if manifest["languages"] and predictions:
+        languages = [Language[name] for name in manifest["languages"]]
+        text, sources = flatten_by_source(files_text)
+        predictions = detect_language(Series(text), languages, options, sources).tolist()
+
+    results = []
+    start = 0
+    for file, file_text in files_text:
+        results.append({"file": file,
+                        "text": file_text,
+                        "predictions": predictions[start:start + len(file_text)]})
+        start += len(file_text)
+
+    _write_json(_get_shard_results_path(manifest_path, shard), results)
+
+
+def merge_shards(manifest_path: str) -> tuple[Series, Optional[Series]]:
+    """Merges the results of all shards in the order of a single-machine run.
+
+    Args:
+        - manifest_path (str): Path of the shard manifest.
+
+    Returns:
+        - Series: Processed text of all files, indexed by the source file of each entry.
+        - Series: Language predictions, None if no language detection was performed."""
+
+    manifest = _read_json(manifest_path)
+
+    results_by_file = {}
+    for shard in range(len(manifest["shards"])):
+        for result in _read_json(_get_shard_results_path(manifest_path, shard)):
+            results_by_file[result["file"]] = result
+
+    rows = [(text, (file, prediction))
+            for file in manifest["files"]
+            for text, prediction in zip(results_by_file[file]["text"],
+                                        results_by_file[file]["predictions"])]
+
+    if manifest["options"].get("Remove repetitions", False):
+        unique_rows: dict[str, tuple[str, Optional[str]]] = {}
+        for text, file_prediction in rows:
+            unique_rows.setdefault(text, file_prediction)
+        rows = list(unique_rows.items())
+
+    processed_text = Series([text for text, _ in rows],
+                            index=[file for _, (file, _) in rows], dtype="string")
+
+    if not manifest["languages"]:
+        return processed_text, None
+
+    return processed_text, Series([prediction for _, (_, prediction) in rows])
+
+
+def _get_weight(file: str, balance_by: str) -> int:
+    size = getsize(file)
+
+    if balance_by == "size":
+        return size
+
+    if splitext(file)[1].lower() == ".pdf":
+        with Document(file) as pdf:
+            return pdf.page_count
+
+    return max(1, size // BYTES_PER_PAGE_ESTIMATE)
+
+
+def _get_shard_results_path(manifest_path: str, shard: int) -> str:
+    return f"{splitext(manifest_path)[0]}.shard{shard}.json"
+
+
+def _read_json(path: str):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _write_json(path: str, data) -> None:
+    """Writes the data to a temporary file first, so that a crashed
+    or interrupted shard never leaves incomplete results behind."""
+
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False)
+
+    replace(f"{path}.tmp", path)
+
+
+if __name__ == "__main__":
+    from gui import ADVANCED_OPTIONS, OPT_IN_OPTIONS
+
+    parser = ArgumentParser(description="Splits a LinguaSort job across several machines.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="Write a shard manifest.")
+    plan_parser.add_argument("manifest")
+    plan_parser.add_argument("files", nargs="+")
+    plan_parser.add_argument("--shards", type=int, required=True,
+                             help="Number of shards, at least 1.")
+    plan_parser.add_argument("--languages", nargs="*", default=[],
+                             help="Languages to detect between, e.g. ENGLISH GERMAN.")
+    plan_parser.add_argument("--balance-by", choices=["size", "pages"], default="size")
+    plan_parser.add_argument("--pdf-pages", type=int, nargs=2, metavar=("START", "STOP"),
+                             help="Zero-based start and end-exclusive stop "
+                                  "of the pages to extract from each PDF file.")
+    plan_parser.add_argument("--option", action="append", default=[], metavar="LABEL=true|false",
+                             help='Overrides a default advanced option, '
+                                  'e.g. "Remove repetitions=false". Can be repeated.')
+
+    run_parser = subparsers.add_parser("run", help="Run a single shard.")
+    run_parser.add_argument("manifest")
+    run_parser.add_argument("shard", type=int)
+
+    merge_parser = subparsers.add_parser("merge", help="Merge all shards and save the report.")
+    merge_parser.add_argument("manifest")
+
+    arguments = parser.parse_args()
+
+    if arguments.command == "plan":
+        if arguments.shards < 1:
+            parser.error("--shards must be at least 1.")
+
+        selected_options = {label: label not in OPT_IN_OPTIONS for label in ADVANCED_OPTIONS}
+
+        for option in arguments.option:
+            label, _, value = option.partition("=")
+            if label not in selected_options or value.lower() not in ("true", "false"):
+                parser.error(f'Invalid option "{option}", '
+                             'expected "<label>=true" or "<label>=false".')
+
+            selected_options[label] = value.lower() == "true"
+
+        write_shard_manifest(arguments.manifest, arguments.files, arguments.shards,
+                             selected_options,
+                             [Language[name.upper()] for name in arguments.languages],
+                             arguments.balance_by,
+                             tuple(arguments.pdf_pages) if arguments.pdf_pages else None)
+
+    elif arguments.command == "run":
+        run_shard(arguments.manifest, arguments.shard)
+
+    else:
+        save_selected_report(*merge_shards(arguments.manifest),
+                             _read_json(arguments.manifest)["options"])
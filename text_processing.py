@@ -8,26 +8,34 @@ This includes removing:
 - other various untranslatables."""
 
 import re
+from datetime import datetime
 from os import system
 from typing import Optional
-from pandas import DataFrame, Series
+from pandas import DataFrame, ExcelWriter, Series
 from numpy import array_split
 
 
-def process_text(text: list[str], options: dict[str, bool]) -> Series:
+_DIGITS_PATTERN = re.compile(r"\d+")
+_PUNCTUATION_PATTERN = re.compile(r"[\W_]+")
+
+
+def process_text(text: list[str], options: dict[str, bool],
+                 sources: Optional[list[str]] = None) -> Series:
     """Processes the extracted text and filters out invalid entries.
 
     Args:
         - text (list[str]): Extracted text.
+        - sources (list[str]): Source of each extracted text entry, e.g. its file path.
+        If given, it is used as the index of the returned Series.
 
     Returns:
         - list[str]: List of filtered text data."""
 
-    series = Series(text).astype('string').str.strip()
+    series = Series(text, index=sources).astype('string').str.strip()
     series = series.replace("\s+", " ")
 
     if options["Remove repetitions"]:
-        series = Series(series.unique())
+        series = series[~series.duplicated()]
 
     series = series.replace("", None).dropna(how="any")
 
@@ -92,12 +100,32 @@ def _remove_hyperlinks(series: Series) -> Series:
     return series.replace(pattern, None, regex=True)
 
 
-def save_report(processed_text: Series, predictions: Optional[Series] = None) -> None:
+def normalize_segment(text: str) -> str:
+    """Computes a normalization key used to group near-duplicate segments.
+    Digits are masked, case is folded, and punctuation and whitespace are collapsed,
+    e.g. both "Page 3 of 210" and "page 4 of 210" result in "page 0 of 0".
+
+    Args:
+        - text (str): Segment to normalize.
+
+    Returns:
+        - str: Normalization key of the segment."""
+
+    text = _DIGITS_PATTERN.sub("0", text.casefold())
+
+    return _PUNCTUATION_PATTERN.sub(" ", text).strip()
+
+
+def save_report(processed_text: Series, predictions: Optional[Series] = None,
+                created: Optional[datetime] = None) -> None:
     """Saves extracted text, along with any language predictions, if there were any.
     Currently this is saved to a Excel file.
 
     Args:
         - processed_text (Series): Pandas Series representing extracted and processed text.
+        - predictions (Series): Language predictions, one per processed text entry.
+        - created (datetime): Creation time stored in the file's metadata, current time by default.
+        Setting it makes the report reproducible byte for byte.
 
     Returns:
         - Series: A new Pandas Series with hyperlinks removed."""
@@ -109,10 +137,19 @@ def save_report(processed_text: Series, predictions: Optional[Series] = None) ->
         df = DataFrame(processed_text)
 
     if len(df) < 750_000:
-        df.to_excel("df.xlsx", header=False, index=False, engine="xlsxwriter")
+        _write_excel(df, "df.xlsx", created, header=False)
         system("df.xlsx")
         return
 
     chunks: list[DataFrame] = array_split(df, len(df) // 750_000)
     for i, chunk in enumerate(chunks):
-        chunk.to_excel(f"df{i}.xlsx", index=False, engine="xlsxwriter")
+        _write_excel(chunk, f"df{i}.xlsx", created)
+
+
+def _write_excel(df: DataFrame, path: str, created: Optional[datetime] = None,
+                 header: bool = True) -> None:
+    with ExcelWriter(path, engine="xlsxwriter") as writer:
+        if created:
+            writer.book.set_properties({"created": created})
+
+        df.to_excel(writer, header=header, index=False)